@@ -1,14 +1,20 @@
 import os
+import sys
+import time
+import asyncio
 import logging
 import shutil
+from collections import deque
 from dotenv import load_dotenv
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
 
 # Import router directly (since routes.py is in the same folder now)
-from routes import router  
+from routes import router, store  
+from fake_backends import fake_backends_enabled
 
 # Configure logging for the whole app
 logging.basicConfig(
@@ -57,6 +63,9 @@ def reset_audio_folder():
 @app.on_event("startup")
 def clear_audio_folder():
     """Clear old audio files when app starts fresh."""
+    if os.getenv("KHETSENSE_MULTI_WORKER"):
+        # Workers share the folder; gunicorn.conf.py resets it once in the master
+        return
     reset_audio_folder()
     logging.info("🧹 Cleared old audio files at startup")
 
@@ -68,6 +77,95 @@ def reset_audio():
     return JSONResponse(content={"status": "success", "message": "Audio folder reset"})
 
 
+# -------------------------
+# Load-test stats (only with fake backends)
+# -------------------------
+LOOP_LAG_INTERVAL = 0.05  # seconds between event-loop lag probes
+STATS_PUBLISH_INTERVAL = 1.0  # seconds between publishing this worker's stats to the store
+STATS_STALE_AFTER = 10.0  # workers that stop publishing (exited) drop out of /loadtest/stats
+loop_lag_samples = deque(maxlen=20000)
+loop_lag_state = {"reset_at": 0.0}
+
+
+async def monitor_loop_lag():
+    """Measure how late the event loop wakes up; blocking handlers show up here."""
+    last_publish = 0.0
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(LOOP_LAG_INTERVAL)
+        loop_lag_samples.append(time.perf_counter() - start - LOOP_LAG_INTERVAL)
+        if start - last_publish >= STATS_PUBLISH_INTERVAL:
+            last_publish = start
+            await run_in_threadpool(sync_worker_stats)
+
+
+def current_rss_mb() -> tuple[float | None, bool]:
+    """
+    Resident memory of this worker in MB, and whether it is the peak RSS
+    (the fallback where /proc is unavailable, e.g. macOS). None if unknown.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024), False
+    except (OSError, ValueError):
+        pass
+    try:
+        import resource  # not available on Windows
+    except ImportError:
+        return None, False
+    # ru_maxrss is in bytes on macOS but kilobytes on Linux
+    unit = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / unit, True
+
+
+def sync_worker_stats():
+    """Apply a reset requested through any worker, then publish this worker's stats."""
+    reset_at = store.read_stats().get("reset_at", 0.0)
+    if reset_at > loop_lag_state["reset_at"]:
+        loop_lag_samples.clear()
+        loop_lag_state["reset_at"] = reset_at
+
+    lags = sorted(loop_lag_samples)
+    rss_mb, rss_is_peak = current_rss_mb()
+    store.publish_stats(f"worker:{os.getpid()}", {
+        "pid": os.getpid(),
+        "rss_mb": round(rss_mb, 1) if rss_mb is not None else None,
+        "rss_is_peak": rss_is_peak,
+        "loop_lag_samples": len(lags),
+        "loop_lag_p99_ms": round(lags[int(len(lags) * 0.99)] * 1000, 1) if lags else 0.0,
+        "loop_lag_max_ms": round(lags[-1] * 1000, 1) if lags else 0.0,
+        "reset_at": loop_lag_state["reset_at"],
+        "updated_at": time.time(),
+    })
+
+
+if fake_backends_enabled():
+    @app.on_event("startup")
+    async def start_loop_lag_monitor():
+        app.state.loop_lag_task = asyncio.create_task(monitor_loop_lag())
+        logging.info("🧪 Fake backends enabled, serving /loadtest/stats")
+
+    @app.get("/loadtest/stats")
+    async def loadtest_stats(reset: bool = False):
+        """
+        Event-loop lag and memory for every live worker, each since the last
+        reset it applied. Workers publish through the shared store, so any
+        worker can answer; a reset reaches all of them within STATS_PUBLISH_INTERVAL.
+        """
+        await run_in_threadpool(sync_worker_stats)
+        stats = await run_in_threadpool(store.read_stats)
+        now = time.time()
+        workers = sorted(
+            (v for k, v in stats.items() if k.startswith("worker:") and now - v["updated_at"] < STATS_STALE_AFTER),
+            key=lambda w: w["pid"],
+        )
+        reset_at = stats.get("reset_at", 0.0)
+        if reset:
+            reset_at = now
+            await run_in_threadpool(store.publish_stats, "reset_at", reset_at)
+        return {"reset_at": reset_at, "publish_interval": STATS_PUBLISH_INTERVAL, "workers": workers}
+
+
 # Mount the directory to serve audio files
 app.mount("/audio", StaticFiles(directory=audio_output_dir), name="audio")
 
@@ -17,21 +17,27 @@ load_dotenv()
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
 SARVAM_API_KEY = os.getenv('SARVAM_API_KEY')
 
-# Validate required environment variables
-if not GEMINI_API_KEY or not SARVAM_API_KEY:
+from fake_backends import fake_backends_enabled, FakeGeminiClient
+
+# Validate required environment variables (not needed when load testing with fakes)
+if not fake_backends_enabled() and (not GEMINI_API_KEY or not SARVAM_API_KEY):
     raise ValueError("Missing required environment variables. Please check your .env file.")
-from google import genai
 
 from rag_retrieve import retrieve_top_k
 
 # -------------------------
 # Gemini client init
 # -------------------------
-api_key = os.getenv("GEMINI_API_KEY")
-if not api_key:
-    raise RuntimeError("GEMINI_API_KEY not set in environment.")
+if fake_backends_enabled():
+    client = FakeGeminiClient()
+else:
+    from google import genai
+
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        raise RuntimeError("GEMINI_API_KEY not set in environment.")
 
-client = genai.Client(api_key=api_key)
+    client = genai.Client(api_key=api_key)
 
 # -------------------------
 # System prompt
@@ -0,0 +1,176 @@
+"""
+Local stand-ins for the Gemini and Sarvam SDK clients, used for load testing.
+
+Enable with KHETSENSE_FAKE_BACKENDS=1. `chatbot` and `sarvam` then build these
+clients instead of the real ones, so the app can be driven at high concurrency
+without API keys, cost, or rate limits. Each fake blocks the calling thread for
+a sampled latency (just like the real synchronous SDKs) and fails at a
+configurable rate.
+
+Per-backend settings (prefix FAKE_GEMINI_ or FAKE_SARVAM_):
+- LATENCY_DIST:  "lognormal" (default), "uniform" or "fixed"
+- LATENCY_MS:    median (lognormal), centre (uniform) or exact (fixed) latency
+- LATENCY_SIGMA: lognormal shape, or +/- spread as a fraction for uniform
+- ERROR_RATE:    probability (0-1) that a call raises FakeBackendError
+"""
+import io
+import os
+import math
+import time
+import wave
+import random
+import logging
+from dataclasses import dataclass
+from types import SimpleNamespace
+
+FAKE_BACKENDS_ENV = "KHETSENSE_FAKE_BACKENDS"
+
+LATENCY_DISTRIBUTIONS = {"lognormal", "uniform", "fixed"}
+
+_FAKE_REPLY = (
+    "For wheat in winter, apply DAP at sowing and split the urea dose across two irrigations. "
+    "Get your soil tested first for the right quantity."
+)
+
+_FAKE_IMAGE_DESCRIPTION = (
+    "The image shows green leaves with small yellow-brown spots, which may be an early fungal infection."
+)
+
+_FAKE_TRANSCRIPTS = [
+    "What fertilizer should I use for wheat in winter?",
+    "Mere dhan ki fasal mein keede lag gaye hain, kya karun?",
+    "How much water does sugarcane need in summer?",
+    "Tamatar ke patte peele ho rahe hain, kya dawai daalun?",
+    "When is the best time to sow mustard?",
+]
+
+
+def fake_backends_enabled() -> bool:
+    """Returns True if the app should use local fakes instead of the real APIs."""
+    return os.getenv(FAKE_BACKENDS_ENV, "").strip().lower() in {"1", "true", "yes", "on"}
+
+
+class FakeBackendError(RuntimeError):
+    """Raised by a fake backend to simulate an upstream API failure."""
+
+
+@dataclass
+class LatencyModel:
+    """Latency distribution and error rate for one fake backend."""
+    dist: str = "lognormal"
+    latency_ms: float = 800.0
+    sigma: float = 0.5
+    error_rate: float = 0.0
+
+    @classmethod
+    def from_env(cls, prefix: str, default_ms: float) -> "LatencyModel":
+        model = cls(
+            dist=os.getenv(f"{prefix}LATENCY_DIST", "lognormal").strip().lower(),
+            latency_ms=float(os.getenv(f"{prefix}LATENCY_MS", default_ms)),
+            sigma=float(os.getenv(f"{prefix}LATENCY_SIGMA", 0.5)),
+            error_rate=float(os.getenv(f"{prefix}ERROR_RATE", 0.0)),
+        )
+        if model.dist not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"{prefix}LATENCY_DIST must be one of {sorted(LATENCY_DISTRIBUTIONS)}")
+        if model.latency_ms < 0:
+            raise ValueError(f"{prefix}LATENCY_MS must be >= 0")
+        if model.sigma < 0:
+            raise ValueError(f"{prefix}LATENCY_SIGMA must be >= 0")
+        if model.dist == "uniform" and model.sigma > 1:
+            raise ValueError(f"{prefix}LATENCY_SIGMA must be <= 1 for the uniform distribution")
+        if not 0 <= model.error_rate <= 1:
+            raise ValueError(f"{prefix}ERROR_RATE must be between 0 and 1")
+        return model
+
+    def sample_seconds(self) -> float:
+        if self.dist == "fixed" or self.latency_ms == 0:
+            ms = self.latency_ms
+        elif self.dist == "uniform":
+            spread = self.latency_ms * self.sigma
+            ms = random.uniform(self.latency_ms - spread, self.latency_ms + spread)
+        else:
+            ms = random.lognormvariate(math.log(self.latency_ms), self.sigma)
+        return max(ms, 0.0) / 1000.0
+
+    def simulate(self, operation: str) -> None:
+        """Block for a sampled latency, then maybe fail like the real API would."""
+        time.sleep(self.sample_seconds())
+        if random.random() < self.error_rate:
+            raise FakeBackendError(f"Simulated upstream failure in {operation}")
+
+
+# -------------------------
+# Gemini
+# -------------------------
+
+class _FakeModels:
+    def __init__(self, latency: LatencyModel):
+        self._latency = latency
+
+    def generate_content(self, model: str, contents) -> SimpleNamespace:
+        self._latency.simulate(f"gemini {model}")
+        has_image = isinstance(contents, list) and any(
+            "inline_data" in part
+            for item in contents if isinstance(item, dict)
+            for part in item.get("parts", [])
+        )
+        return SimpleNamespace(text=_FAKE_IMAGE_DESCRIPTION if has_image else _FAKE_REPLY)
+
+
+class FakeGeminiClient:
+    """Mimics the parts of google.genai.Client used by chatbot.py."""
+
+    def __init__(self, latency: LatencyModel | None = None):
+        self.latency = latency or LatencyModel.from_env("FAKE_GEMINI_", default_ms=800)
+        self.models = _FakeModels(self.latency)
+        logging.info("🧪 Using fake Gemini backend: %s", self.latency)
+
+
+# -------------------------
+# Sarvam
+# -------------------------
+
+def _silent_wav(seconds: float = 1.0, rate: int = 16000) -> bytes:
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(b"\x00\x00" * int(seconds * rate))
+    return buf.getvalue()
+
+
+class _FakeTextToSpeech:
+    def __init__(self, latency: LatencyModel):
+        self._latency = latency
+
+    def convert(self, text: str, target_language_code: str, **kwargs) -> SimpleNamespace:
+        self._latency.simulate("sarvam tts")
+        # Roughly 15 characters of speech per second, like a real voice
+        return SimpleNamespace(audio=_silent_wav(seconds=min(max(len(text) / 15, 1.0), 30.0)))
+
+
+class _FakeSpeechToText:
+    def __init__(self, latency: LatencyModel):
+        self._latency = latency
+
+    def transcribe(self, file, language_code: str, model: str) -> SimpleNamespace:
+        file.read()
+        self._latency.simulate("sarvam asr")
+        return SimpleNamespace(transcript=random.choice(_FAKE_TRANSCRIPTS))
+
+
+class FakeSarvamClient:
+    """Mimics the parts of sarvamai.SarvamAI used by sarvam.py."""
+
+    def __init__(self, latency: LatencyModel | None = None):
+        self.latency = latency or LatencyModel.from_env("FAKE_SARVAM_", default_ms=400)
+        self.text_to_speech = _FakeTextToSpeech(self.latency)
+        self.speech_to_text = _FakeSpeechToText(self.latency)
+        logging.info("🧪 Using fake Sarvam backend: %s", self.latency)
+
+
+def save(audio: SimpleNamespace, filepath: str) -> None:
+    """Drop-in for sarvamai.play.save that writes a fake TTS response to disk."""
+    with open(filepath, "wb") as f:
+        f.write(audio.audio)
@@ -0,0 +1,31 @@
+"""
+Multi-worker serving mode:
+
+    gunicorn app:app -c gunicorn.conf.py
+
+The app (RAG index + MiniLM model) is loaded once in the master before the
+workers fork, so they share its memory copy-on-write. Sessions and cached
+responses go to a SQLite store shared by all workers, so any worker can serve
+any session.
+"""
+import os
+import multiprocessing
+
+bind = os.getenv("KHETSENSE_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = 120
+
+# Must be set before the app is imported (preload happens after this file runs)
+os.environ.setdefault("KHETSENSE_STORE_PATH", "khetsense_store.sqlite3")
+os.environ["KHETSENSE_MULTI_WORKER"] = "1"
+# One inference thread per worker, otherwise N workers each try to use every core
+os.environ.setdefault("OMP_NUM_THREADS", "1")
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+
+def on_starting(server):
+    """Reset the audio folder once in the master, not in every (re)started worker."""
+    from app import reset_audio_folder
+    reset_audio_folder()
@@ -0,0 +1,292 @@
+"""
+Load generator for the KhetSense API.
+
+Replays a mix of text chat, image chat, audio chat and text-to-speech traffic
+against a running server at increasing concurrency, and reports throughput,
+tail latency, server event-loop lag and memory growth for each stage.
+
+Start the server with fake backends so no real API is called:
+
+    KHETSENSE_FAKE_BACKENDS=1 uvicorn app:app --port 8000
+
+Then run:
+
+    python loadtest.py --concurrency 1,4,16,64 --duration 30
+
+Speak requests use varied text so they mostly miss the server's TTS cache and
+measure speech generation, not the cache-hit path.
+"""
+import io
+import time
+import wave
+import random
+import asyncio
+import argparse
+from collections import defaultdict
+
+import httpx
+
+DEFAULT_MIX = "text=60,image=10,audio=20,speak=10"
+
+SAMPLE_QUESTIONS = [
+    "What fertilizer for wheat in winter?",
+    "Best time to plant rice?",
+    "Mere kapas mein safed makkhi aa gayi hai, kya spray karun?",
+    "How to control aphids in mustard?",
+    "Which variety of paddy is good for low water areas?",
+    "Gehun mein peela ratua rog ka upay batayein",
+]
+
+SAMPLE_LOCATIONS = [None, "Punjab", "Bihar", "Maharashtra", "Tamil Nadu"]
+
+SPEAK_LANGUAGES = ["en-IN", "hi-IN", "ta-IN", "mr-IN"]
+
+# Pause after a connection error so a down server doesn't turn every user into a busy loop
+CONNECT_ERROR_BACKOFF = 0.5
+
+# 1x1 green PNG, small enough that image traffic measures the pipeline, not the upload
+TINY_PNG = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010802000000907753de"
+    "0000000c49444154789c6350daa8040001ee00f6c463f4be0000000049454e44ae426082"
+)
+
+
+def make_wav(seconds: float = 2.0, rate: int = 16000) -> bytes:
+    """Silent mono WAV clip, the size of a short spoken question."""
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(b"\x00\x00" * int(seconds * rate))
+    return buf.getvalue()
+
+
+def parse_mix(mix: str) -> dict[str, float]:
+    weights = {}
+    for item in mix.split(","):
+        kind, _, weight = item.partition("=")
+        kind = kind.strip()
+        if kind not in REQUEST_KINDS:
+            raise argparse.ArgumentTypeError(f"Unknown request kind '{kind}', expected one of {sorted(REQUEST_KINDS)}")
+        weights[kind] = float(weight or 1)
+    return weights
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(int(len(sorted_values) * pct), len(sorted_values) - 1)]
+
+
+# -------------------------
+# Request builders
+# -------------------------
+
+async def send_text(client: httpx.AsyncClient, session_id: str | None) -> httpx.Response:
+    data = {"message": random.choice(SAMPLE_QUESTIONS)}
+    location = random.choice(SAMPLE_LOCATIONS)
+    if location:
+        data["location"] = location
+    if session_id:
+        data["session_id"] = session_id
+    return await client.post("/api/chat", data=data)
+
+
+async def send_image(client: httpx.AsyncClient, session_id: str | None) -> httpx.Response:
+    data = {"message": "What is wrong with this leaf?"}
+    if session_id:
+        data["session_id"] = session_id
+    files = {"image": ("leaf.png", TINY_PNG, "image/png")}
+    return await client.post("/api/chat/image", data=data, files=files)
+
+
+async def send_audio(client: httpx.AsyncClient, session_id: str | None) -> httpx.Response:
+    data = {"language": "hi-IN"}
+    if session_id:
+        data["session_id"] = session_id
+    files = {"audio": ("question.wav", AUDIO_CLIP, "audio/wav")}
+    return await client.post("/api/audio-chat", data=data, files=files)
+
+
+async def send_speak(client: httpx.AsyncClient, session_id: str | None) -> httpx.Response:
+    text = (
+        f"Apply {random.randint(20, 200)} kg urea per hectare "
+        f"and irrigate again after {random.randint(2, 30)} days."
+    )
+    payload = {"text": text, "language": random.choice(SPEAK_LANGUAGES)}
+    return await client.post("/api/speak", json=payload)
+
+
+REQUEST_KINDS = {
+    "text": send_text,
+    "image": send_image,
+    "audio": send_audio,
+    "speak": send_speak,
+}
+
+AUDIO_CLIP = make_wav()
+
+
+# -------------------------
+# Load stages
+# -------------------------
+
+class StageResult:
+    def __init__(self, concurrency: int):
+        self.concurrency = concurrency
+        # Kept apart so fast failures don't pull success percentiles down,
+        # while timeouts still show up in the failed and overall tails
+        self.latencies = defaultdict(list)
+        self.error_latencies = defaultdict(list)
+        self.elapsed = 0.0
+        self.server_before = None
+        self.server_after = None
+
+    @property
+    def total(self) -> int:
+        return sum(len(v) for v in self.latencies.values()) + self.errors
+
+    @property
+    def errors(self) -> int:
+        return sum(len(v) for v in self.error_latencies.values())
+
+
+async def virtual_user(client, kinds, weights, deadline, turns_per_session, result: StageResult):
+    """Closed-loop user: sends the next request as soon as the previous one returns."""
+    session_id, turns = None, 0
+    while time.perf_counter() < deadline:
+        kind = random.choices(kinds, weights)[0]
+        start = time.perf_counter()
+        backoff = 0.0
+        try:
+            response = await REQUEST_KINDS[kind](client, session_id)
+            ok = response.status_code == 200
+        except httpx.TimeoutException:
+            ok, response = False, None
+        except httpx.HTTPError:
+            ok, response, backoff = False, None, CONNECT_ERROR_BACKOFF
+        latency = time.perf_counter() - start
+
+        if not ok:
+            result.error_latencies[kind].append(latency)
+            await asyncio.sleep(backoff)
+            continue
+        result.latencies[kind].append(latency)
+
+        # Keep conversations going so session history grows like real usage
+        session_id = response.json().get("session_id", session_id)
+        turns += 1
+        if turns >= turns_per_session:
+            session_id, turns = None, 0
+
+
+async def fetch_server_stats(client: httpx.AsyncClient, reset: bool = False) -> dict | None:
+    try:
+        response = await client.get("/loadtest/stats", params={"reset": reset})
+        return response.json() if response.status_code == 200 else None
+    except httpx.HTTPError:
+        return None
+
+
+async def run_stage(base_url, concurrency, duration, weights, turns_per_session, timeout) -> StageResult:
+    result = StageResult(concurrency)
+    limits = httpx.Limits(max_connections=concurrency + 1, max_keepalive_connections=concurrency + 1)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        result.server_before = await fetch_server_stats(client, reset=True)
+        kinds, kind_weights = list(weights), list(weights.values())
+        start = time.perf_counter()
+        deadline = start + duration
+        await asyncio.gather(*(
+            virtual_user(client, kinds, kind_weights, deadline, turns_per_session, result)
+            for _ in range(concurrency)
+        ))
+        result.elapsed = time.perf_counter() - start
+        # Give every worker a chance to publish stats that cover the whole stage
+        if result.server_before:
+            await asyncio.sleep(result.server_before["publish_interval"] * 1.5)
+        result.server_after = await fetch_server_stats(client)
+    return result
+
+
+# -------------------------
+# Reporting
+# -------------------------
+
+def latency_row(label: str, ok: int, errors: int, latencies: list[float]) -> str:
+    lat = sorted(latencies)
+    return (f"{label:<8}{ok:>7}{errors:>6}"
+            f"{percentile(lat, 0.50) * 1000:>9.0f}{percentile(lat, 0.95) * 1000:>9.0f}"
+            f"{percentile(lat, 0.99) * 1000:>9.0f}{(lat[-1] if lat else 0) * 1000:>9.0f}")
+
+
+def print_server_stats(before: dict | None, after: dict | None):
+    if not before or not after:
+        print("server stats unavailable (start the server with KHETSENSE_FAKE_BACKENDS=1)")
+        return
+    rss_before = {w["pid"]: w["rss_mb"] for w in before["workers"]}
+    for worker in after["workers"]:
+        pid, rss = worker["pid"], worker["rss_mb"]
+        line = (f"worker pid {pid}: loop lag p99 {worker['loop_lag_p99_ms']} ms, "
+                f"max {worker['loop_lag_max_ms']} ms; ")
+        if rss is None:
+            line += "RSS unavailable"
+        else:
+            rss_label = "peak RSS" if worker["rss_is_peak"] else "RSS"
+            if rss_before.get(pid) is not None:
+                line += f"{rss_label} {rss_before[pid]} -> {rss} MB ({rss - rss_before[pid]:+.1f} MB)"
+            else:
+                line += f"{rss_label} {rss} MB (new worker, no baseline)"
+        if worker["reset_at"] < after["reset_at"]:
+            line += " [loop lag includes earlier stages, worker missed the reset]"
+        print(line)
+    gone = set(rss_before) - {w["pid"] for w in after["workers"]}
+    if gone:
+        print(f"workers gone during the stage: {sorted(gone)}")
+
+
+def print_stage(result: StageResult):
+    ok_latencies = [l for v in result.latencies.values() for l in v]
+    error_latencies = [l for v in result.error_latencies.values() for l in v]
+    ok, errors = len(ok_latencies), result.errors
+    rps = ok / result.elapsed if result.elapsed else 0.0
+
+    print(f"\n=== concurrency {result.concurrency} ({result.elapsed:.1f}s) ===")
+    print(f"requests: {result.total}  ok: {ok}  errors: {errors} "
+          f"({100 * errors / result.total if result.total else 0:.1f}%)  throughput: {rps:.1f} req/s")
+    print("latency of successful requests, except the 'failed' and 'all' rows:")
+    print(f"{'kind':<8}{'ok':>7}{'err':>6}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    for kind in sorted(set(result.latencies) | set(result.error_latencies)):
+        print(latency_row(kind, len(result.latencies[kind]), len(result.error_latencies[kind]),
+                          result.latencies[kind]))
+    print(latency_row("ok", ok, 0, ok_latencies))
+    if errors:
+        print(latency_row("failed", 0, errors, error_latencies))
+    print(latency_row("all", ok, errors, ok_latencies + error_latencies))
+
+    print_server_stats(result.server_before, result.server_after)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Load test the KhetSense API.")
+    parser.add_argument("--url", default="http://localhost:8000", help="Base URL of the running server")
+    parser.add_argument("--concurrency", default="1,4,16,64",
+                        help="Comma-separated concurrency levels, run in order")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds per concurrency level")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f"Traffic mix as kind=weight pairs (default: {DEFAULT_MIX})")
+    parser.add_argument("--turns-per-session", type=int, default=6,
+                        help="Requests per conversation before a user starts a new session")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request timeout in seconds")
+    args = parser.parse_args()
+
+    levels = [int(c) for c in args.concurrency.split(",")]
+    print(f"Load testing {args.url} with mix {args.mix}, {args.duration:.0f}s per level")
+    for concurrency in levels:
+        result = await run_stage(args.url, concurrency, args.duration, args.mix,
+                                 args.turns_per_session, args.timeout)
+        print_stage(result)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,18 +1,42 @@
+import os
+import logging
 import numpy as np
 from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
 
-# Load precomputed embeddings
-npz = np.load("rag_embeddings.npz", allow_pickle=True)
-embedded_data = npz["embeddings"]
-texts = npz["texts"]
-metadata = npz["meta"]
+EMBEDDINGS_FILE = "rag_embeddings.npz"
+# Uncompressed copies of the arrays, memory-mapped so every worker process
+# shares the same physical pages instead of holding its own copy
+INDEX_DIR = ".rag_index"
+
+
+def _extract_index():
+    """Unpack the compressed .npz into plain .npy files once (atomic, safe across workers)."""
+    os.makedirs(INDEX_DIR, exist_ok=True)
+    npz = np.load(EMBEDDINGS_FILE, allow_pickle=True)
+    for name in ("embeddings", "texts"):
+        tmp_path = os.path.join(INDEX_DIR, f"{name}.{os.getpid()}.tmp.npy")
+        np.save(tmp_path, np.ascontiguousarray(npz[name]), allow_pickle=False)
+        os.replace(tmp_path, os.path.join(INDEX_DIR, f"{name}.npy"))
+    logging.info("📦 Extracted RAG index to %s", INDEX_DIR)
+
+
+def _load_index():
+    paths = [os.path.join(INDEX_DIR, f"{name}.npy") for name in ("embeddings", "texts")]
+    source_mtime = os.path.getmtime(EMBEDDINGS_FILE)
+    if not all(os.path.exists(p) and os.path.getmtime(p) >= source_mtime for p in paths):
+        _extract_index()
+    return [np.load(p, mmap_mode="r") for p in paths]
+
+
+# Load precomputed embeddings (normalized at build time, see embeddings.py)
+embedded_data, texts = _load_index()
 
 # Load sentence transformer model
 model = SentenceTransformer("all-MiniLM-L6-v2")
 
 def retrieve_top_k(query, k=5):
     query_embedding = model.encode([query], normalize_embeddings=True)
-    similarities = cosine_similarity(query_embedding, embedded_data)[0]
+    # Both sides are unit vectors, so the dot product is the cosine similarity
+    similarities = embedded_data @ query_embedding[0]
     top_k_indices = similarities.argsort()[-k:][::-1]
-    return [texts[i] for i in top_k_indices]
\ No newline at end of file
+    return [str(texts[i]) for i in top_k_indices]
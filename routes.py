@@ -5,10 +5,11 @@ import os
 import uuid
 import logging
 from fastapi.responses import JSONResponse
-from cachetools import TTLCache
+from fastapi.concurrency import run_in_threadpool
 
 from chatbot import is_available, ask, ask_with_image, get_system_prompt
-from sarvam import speech_to_text, text_to_speech, speech_to_text_bytes  # updated import
+from sarvam import speech_to_text, text_to_speech, speech_to_text_bytes, AUDIO_DIR  # updated import
+from session_store import open_store
 
 router = APIRouter(
     prefix="/api",
@@ -19,14 +20,22 @@ SUPPORTED_LANGUAGES = {
     "en-IN", "hi-IN", "bn-IN", "te-IN", "mr-IN", "ta-IN", "gu-IN"
 }
 
-# In-memory session chat history
-chat_sessions = {}
+# Session chat history and response cache (shared across workers if configured)
+store = open_store()
 
 
 def add_history(history, role, content):
     history.append({"role": role, "content": content})
     return history
 
+
+async def save_turns(session_id, turns):
+    """Append new turns to the session; a failed write is logged, not turned into a 500 after the reply is ready."""
+    try:
+        await run_in_threadpool(store.append_messages, session_id, turns)
+    except Exception:
+        logging.exception(f"[SESSION: {session_id}] Failed to save turns, conversation history will miss them")
+
 # -------------------------
 # Utility endpoints
 # -------------------------
@@ -69,7 +78,8 @@ async def chat(
         # Initialize or get session
         if not session_id:
             session_id = str(uuid.uuid4())
-        history = chat_sessions.get(session_id, [])
+        history = await run_in_threadpool(store.get_session, session_id)
+        new_from = len(history)
         
         logging.info(f"[SESSION: {session_id}] Processing message. History length: {len(history)}")
 
@@ -85,8 +95,8 @@ async def chat(
         # Add bot response to history
         add_history(history, "agent", reply)
         
-        # Update session
-        chat_sessions[session_id] = history
+        # Append only this turn, so overlapping requests don't overwrite each other
+        await save_turns(session_id, history[new_from:])
         
         logging.info(f"[SESSION: {session_id}] Response generated successfully")
         return {
@@ -114,7 +124,6 @@ async def chat_with_image_endpoint(
         # Initialize or get session
         if not session_id:
             session_id = str(uuid.uuid4())
-        history = chat_sessions.get(session_id, [])
 
         logging.info(f"[SESSION: {session_id}] Processing image message")
         
@@ -141,9 +150,9 @@ async def chat_with_image_endpoint(
         )
 
         # Update history with the interaction
-        add_history(history, "user", f"[Image uploaded] {message}")
-        add_history(history, "agent", reply)
-        chat_sessions[session_id] = history
+        new_turns = add_history([], "user", f"[Image uploaded] {message}")
+        add_history(new_turns, "agent", reply)
+        await save_turns(session_id, new_turns)
 
         logging.info(f"[SESSION: {session_id}] Image response generated successfully")
         return {
@@ -157,8 +166,7 @@ async def chat_with_image_endpoint(
 
 @router.post("/chat/reset")
 async def reset_chat(session_id: str = Form(...)):
-    if session_id in chat_sessions:
-        del chat_sessions[session_id]
+    if await run_in_threadpool(store.delete_session, session_id):
         return {"message": "Session reset", "session_id": session_id}
     return {"message": "Session not found", "session_id": session_id}
 
@@ -176,13 +184,19 @@ class SpeakRequest(BaseModel):
 @router.post("/speak")
 async def speak_endpoint(request_body: SpeakRequest, request: Request):
     """Text-to-Speech endpoint."""
-    from fastapi.concurrency import run_in_threadpool
     try:
         if request_body.language not in SUPPORTED_LANGUAGES:
             raise HTTPException(status_code=400, detail="Unsupported language selected.")
-        relative_audio_url = await run_in_threadpool(text_to_speech, request_body.text, request_body.language)
+        # Reuse audio already generated for the same text, as long as the file is still on disk
+        cache_key = f"tts:{request_body.language}:{request_body.text}"
+        relative_audio_url = await run_in_threadpool(store.cache_get, cache_key)
+        if relative_audio_url and not os.path.exists(os.path.join(AUDIO_DIR, os.path.basename(relative_audio_url))):
+            relative_audio_url = None
         if relative_audio_url is None:
-            raise HTTPException(status_code=500, detail="TTS failed using Sarvam SDK")
+            relative_audio_url = await run_in_threadpool(text_to_speech, request_body.text, request_body.language)
+            if relative_audio_url is None:
+                raise HTTPException(status_code=500, detail="TTS failed using Sarvam SDK")
+            await run_in_threadpool(store.cache_set, cache_key, relative_audio_url)
         absolute_audio_url = f"{str(request.base_url).rstrip('/')}{relative_audio_url}"
         return {"audio_url": absolute_audio_url}
     except Exception as e:
@@ -192,7 +206,6 @@ async def speak_endpoint(request_body: SpeakRequest, request: Request):
 @router.post("/transcribe")
 async def transcribe_endpoint(audio: UploadFile = File(...), language: str = Form("en-IN")):
     """Speech-to-Text endpoint."""
-    from fastapi.concurrency import run_in_threadpool
     if language not in SUPPORTED_LANGUAGES:
         raise HTTPException(status_code=400, detail="Unsupported language selected.")
     try:
@@ -214,7 +227,6 @@ async def audio_chat(
     location: Optional[str] = Form(None)
 ):
     """End-to-end audio chat: transcribe → Gemini → respond."""
-    from fastapi.concurrency import run_in_threadpool
     if language not in SUPPORTED_LANGUAGES:
         raise HTTPException(status_code=400, detail="Unsupported language selected.")
     try:
@@ -224,14 +236,15 @@ async def audio_chat(
             raise HTTPException(status_code=500, detail="ASR failed using Sarvam SDK.")
         if not session_id:
             session_id = str(uuid.uuid4())
-        history = chat_sessions.get(session_id, [])
+        history = await run_in_threadpool(store.get_session, session_id)
+        new_from = len(history)
         if not any(h["role"] == "system" for h in history):
             add_history(history, "system", get_system_prompt())
         contextual_message = f"Context: The user is in {location}. Question: {transcript}" if location else transcript
         add_history(history, "user", contextual_message)
         reply = await run_in_threadpool(ask, history)
         add_history(history, "agent", reply)
-        chat_sessions[session_id] = history
+        await save_turns(session_id, history[new_from:])
         return {
             "transcript": transcript,
             "response": reply,
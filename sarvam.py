@@ -3,17 +3,24 @@ import uuid
 import logging
 from dotenv import load_dotenv
 from io import BytesIO
-from sarvamai import SarvamAI
-from sarvamai.play import save
+from fake_backends import fake_backends_enabled
 
 # Load environment variables
 load_dotenv()
 
-SARVAM_API_KEY = os.getenv("SARVAM_API_KEY")
-if not SARVAM_API_KEY:
-    raise RuntimeError("SARVAM_API_KEY not set in environment. Please add it to your .env file.")
+if fake_backends_enabled():
+    from fake_backends import FakeSarvamClient, save
 
-client = SarvamAI(api_subscription_key=SARVAM_API_KEY)
+    client = FakeSarvamClient()
+else:
+    from sarvamai import SarvamAI
+    from sarvamai.play import save
+
+    SARVAM_API_KEY = os.getenv("SARVAM_API_KEY")
+    if not SARVAM_API_KEY:
+        raise RuntimeError("SARVAM_API_KEY not set in environment. Please add it to your .env file.")
+
+    client = SarvamAI(api_subscription_key=SARVAM_API_KEY)
 
 # Voice model mapping
 VOICE_MODEL_MAPPING = {
@@ -0,0 +1,251 @@
+"""
+Chat session and response cache storage.
+
+By default everything lives in process memory, which is fine for a single
+worker. Set KHETSENSE_STORE_PATH to a SQLite file (gunicorn.conf.py does this)
+to share sessions and cached responses between all worker processes, so any
+worker can serve any session.
+
+Sessions are append-only: handlers add their new turns with append_messages()
+instead of writing back the whole history, so overlapping requests for the
+same session never overwrite each other's turns.
+"""
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from cachetools import TTLCache
+
+STORE_PATH_ENV = "KHETSENSE_STORE_PATH"
+
+SESSION_TTL = 24 * 60 * 60  # drop sessions idle for a day
+SESSION_MAX_ITEMS = 100_000
+CACHE_TTL = 60 * 60
+CACHE_MAX_ITEMS = 1024
+
+# Keep lock waits short; store calls run in the threadpool, but a long wait
+# still ties up a thread while another worker holds the write lock
+BUSY_TIMEOUT = 0.5  # seconds
+# Session writes hold a reply that was already paid for, so they retry
+# instead of giving up after one busy timeout like the best-effort cache
+SESSION_WRITE_ATTEMPTS = 6
+SESSION_WRITE_BACKOFF = 0.05  # seconds, doubled after each busy attempt
+PURGE_INTERVAL = 5 * 60  # seconds between purges of expired rows, per worker
+
+
+class MemoryStore:
+    """Per-process store, used when running a single worker."""
+
+    def __init__(self):
+        self._sessions = TTLCache(maxsize=SESSION_MAX_ITEMS, ttl=SESSION_TTL)
+        self._cache = TTLCache(maxsize=CACHE_MAX_ITEMS, ttl=CACHE_TTL)
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def get_session(self, session_id: str) -> list[dict]:
+        with self._lock:
+            return list(self._sessions.get(session_id, []))
+
+    def append_messages(self, session_id: str, messages: list[dict]) -> None:
+        with self._lock:
+            history = self._sessions.get(session_id, [])
+            history.extend(messages)
+            self._sessions[session_id] = history  # re-set to refresh the TTL
+
+    def delete_session(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def cache_get(self, key: str):
+        with self._lock:
+            return self._cache.get(key)
+
+    def cache_set(self, key: str, value) -> None:
+        with self._lock:
+            self._cache[key] = value
+
+    def publish_stats(self, key: str, value) -> None:
+        with self._lock:
+            self._stats[key] = value
+
+    def read_stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats)
+
+
+class SqliteStore:
+    """
+    Store shared by all workers on this machine, backed by SQLite in WAL mode.
+    Connections are opened lazily per thread and per process, so the store
+    can be created before gunicorn forks its workers.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._purge_lock = threading.Lock()
+        self._last_purge = time.monotonic()
+        conn = self._connect()
+        try:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS messages ("
+                "seq INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT NOT NULL, "
+                "role TEXT NOT NULL, content TEXT NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS messages_session ON messages (session_id, seq)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS session_activity ("
+                "id TEXT PRIMARY KEY, updated_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS session_activity_updated ON session_activity (updated_at)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires_at)")
+            conn.execute("CREATE TABLE IF NOT EXISTS loadtest_stats (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            conn.execute("DELETE FROM loadtest_stats")  # left over from a previous server run
+            self._purge(conn)
+        finally:
+            conn.close()
+        logging.info("🗄️ Using shared session store at %s", path)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        # Never reuse a connection inherited across fork()
+        if getattr(self._local, "pid", None) != os.getpid():
+            self._local.conn = self._connect()
+            self._local.pid = os.getpid()
+        return self._local.conn
+
+    @contextmanager
+    def _transaction(self, conn: sqlite3.Connection):
+        # IMMEDIATE takes the write lock up front, so the whole block is atomic
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _purge(self, conn: sqlite3.Connection) -> None:
+        """Delete expired sessions and cache entries."""
+        now = time.time()
+        with self._transaction(conn):
+            conn.execute(
+                "DELETE FROM messages WHERE session_id IN "
+                "(SELECT id FROM session_activity WHERE updated_at < ?)",
+                (now - SESSION_TTL,),
+            )
+            conn.execute("DELETE FROM session_activity WHERE updated_at < ?", (now - SESSION_TTL,))
+            conn.execute("DELETE FROM cache WHERE expires_at < ?", (now,))
+
+    def _after_write(self) -> None:
+        # Each worker purges on its own clock; purging is idempotent, so N
+        # workers just purge N times per PURGE_INTERVAL
+        with self._purge_lock:
+            if time.monotonic() - self._last_purge < PURGE_INTERVAL:
+                return
+            self._last_purge = time.monotonic()
+        try:
+            self._purge(self._conn)
+        except sqlite3.OperationalError:
+            logging.warning("Store purge skipped, database busy")
+
+    def get_session(self, session_id: str) -> list[dict]:
+        rows = self._conn.execute(
+            "SELECT m.role, m.content FROM messages m "
+            "JOIN session_activity s ON s.id = m.session_id "
+            "WHERE m.session_id = ? AND s.updated_at >= ? ORDER BY m.seq",
+            (session_id, time.time() - SESSION_TTL),
+        ).fetchall()
+        return [{"role": role, "content": content} for role, content in rows]
+
+    def append_messages(self, session_id: str, messages: list[dict]) -> None:
+        backoff = SESSION_WRITE_BACKOFF
+        for attempt in range(1, SESSION_WRITE_ATTEMPTS + 1):
+            try:
+                with self._transaction(self._conn) as conn:
+                    conn.executemany(
+                        "INSERT INTO messages (session_id, role, content) VALUES (?, ?, ?)",
+                        [(session_id, m["role"], m["content"]) for m in messages],
+                    )
+                    conn.execute(
+                        "INSERT OR REPLACE INTO session_activity (id, updated_at) VALUES (?, ?)",
+                        (session_id, time.time()),
+                    )
+                break
+            except sqlite3.OperationalError:
+                if attempt == SESSION_WRITE_ATTEMPTS:
+                    raise
+                logging.warning("Session write busy (attempt %d), retrying", attempt)
+                time.sleep(backoff)
+                backoff *= 2
+        self._after_write()
+
+    def delete_session(self, session_id: str) -> bool:
+        with self._transaction(self._conn) as conn:
+            conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+            return conn.execute("DELETE FROM session_activity WHERE id = ?", (session_id,)).rowcount > 0
+
+    def cache_get(self, key: str):
+        # The cache is best-effort: a busy database counts as a miss
+        try:
+            row = self._conn.execute(
+                "SELECT value FROM cache WHERE key = ? AND expires_at >= ?", (key, time.time())
+            ).fetchone()
+        except sqlite3.OperationalError:
+            logging.warning("Cache read skipped, database busy")
+            return None
+        return json.loads(row[0]) if row else None
+
+    def cache_set(self, key: str, value) -> None:
+        try:
+            with self._transaction(self._conn) as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(value, ensure_ascii=False), time.time() + CACHE_TTL),
+                )
+                # Cap the table like the in-memory TTLCache, evicting what expires soonest
+                conn.execute(
+                    "DELETE FROM cache WHERE key IN "
+                    "(SELECT key FROM cache ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+                    (CACHE_MAX_ITEMS,),
+                )
+        except sqlite3.OperationalError:
+            logging.warning("Cache write skipped, database busy")
+            return
+        self._after_write()
+
+    def publish_stats(self, key: str, value) -> None:
+        """Load-test stats, one key per worker; best-effort like the cache."""
+        try:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO loadtest_stats (key, value) VALUES (?, ?)", (key, json.dumps(value))
+            )
+        except sqlite3.OperationalError:
+            logging.warning("Stats write skipped, database busy")
+
+    def read_stats(self) -> dict:
+        try:
+            rows = self._conn.execute("SELECT key, value FROM loadtest_stats").fetchall()
+        except sqlite3.OperationalError:
+            logging.warning("Stats read skipped, database busy")
+            return {}
+        return {key: json.loads(value) for key, value in rows}
+
+
+def open_store() -> MemoryStore | SqliteStore:
+    """Returns the shared SQLite store if configured, else an in-memory one."""
+    path = os.getenv(STORE_PATH_ENV)
+    return SqliteStore(path) if path else MemoryStore()